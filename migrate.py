@@ -1,13 +1,24 @@
 import os
 import re
+import shutil
 import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterable, List, MutableMapping, Optional
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    MutableMapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import click
-import requirements
-import toml
-from requirements.requirement import Requirement
 
 PREVIOUS_SAFETY_COMMAND = '"poetry export --dev --without-hashes -f requirements.txt | safety check --full-report --stdin"'
 NEW_SAFETY_COMMAND = '"poetry export --dev --without-hashes -f requirements.txt | safety check --full-report --stdin"'
@@ -17,116 +28,263 @@ PREVIOUS_TIME_COMMAND = (
 )
 NEW_TIME_COMMAND = '{ { time eval "$cmd" >>"$stdout" 2>&1 ; } >>"$timer" 2>&1 ; } &'
 
+# Concurrent `poetry install` runs compete for the same cache and network
+DEFAULT_MAX_WORKERS = 4
 
-package_hash_re = re.compile(r"\-\-hash=sha256:[0-9a-f]{64}")
-version_re = re.compile(r"version=\"(?P<version>.*)\"", re.MULTILINE)
-description_re = re.compile(r"description=\"(?P<description>.*)\"", re.MULTILINE)
-new_line_description_re = re.compile(
-    r"description=\(.*\n\s*\"(?P<description>.*)\"\n.*\)", re.MULTILINE
-)
-author_re = re.compile(r"author=\"(?P<author>.*)\"", re.MULTILINE)
-author_email_re = re.compile(r"author_email=\"(?P<author_email>.*)\"", re.MULTILINE)
-url_re = re.compile(r"url=\"(?P<url>.*)\"", re.MULTILINE)
-python_requires_re = re.compile(
-    r"python_requires=\"(?P<python_requires>.*)\"", re.MULTILINE
+REQUIRED_SETUP_FIELDS = ("author", "author_email", "url", "version")
+
+MIGRATE_STAMP_FILENAME = ".migrate-stamp"
+# Inputs besides the requirements files, which load_requirements() reports
+MIGRATE_STAMP_INPUTS = ("setup.py", "pyproject.toml")
+
+
+package_hash_re = re.compile(rb"\-\-hash=sha256:[0-9a-f]{64}")
+setup_re = re.compile(
+    r"author=\"(?P<author>[^\"]*)\""
+    r"|author_email=\"(?P<author_email>[^\"]*)\""
+    r"|url=\"(?P<url>[^\"]*)\""
+    r"|version=\"(?P<version>[^\"]*)\""
+    r"|python_requires=\"(?P<python_requires>[^\"]*)\""
+    r"|description=\"(?P<description>[^\"]*)\""
+    r"|description=\(.*\n\s*\"(?P<new_line_description>[^\"]*)\"\s*\n.*\)"
+    r"|(?P<script>\"(?P<cli>[\w_]+)\s+=\s+(?P<package>[^\"]+:[^\"]+)\")",
+    re.MULTILINE,
 )
-console_scripts_re = re.compile(
-    r"\"(?P<cli>[\w_]+)\s+=\s+(?P<package>.+:.+)\"", re.MULTILINE
+egg_re = re.compile(r"[#&]egg=(?P<name>[^&\[]+)(?:\[(?P<extras>[^\]]*)\])?")
+requirement_comment_re = re.compile(r"(?:^|\s+)#.*$")
+requirement_option_re = re.compile(
+    r"^(?P<option>--[\w-]+|-\w)(?:\s*=\s*|\s*)(?P<value>.*)$"
 )
 
+# Pip options which don't describe a dependency
+IGNORED_REQUIREMENT_OPTIONS = {
+    "-c",
+    "--constraint",
+    "-i",
+    "--index-url",
+    "--extra-index-url",
+    "-f",
+    "--find-links",
+    "--no-index",
+    "--trusted-host",
+    "--pre",
+    "--prefer-binary",
+    "--require-hashes",
+    "--no-binary",
+    "--only-binary",
+    "--use-feature",
+}
+
+
+@dataclass
+class SetupInfo:
+    author: str = ""
+    author_email: str = ""
+    url: str = ""
+    version: str = ""
+    python_requires: str = ""
+    description: str = ""
+    scripts: Dict[str, str] = field(default_factory=dict)
+
+
+def scan_setup(setup: str) -> SetupInfo:
+    setup_info = SetupInfo()
+    new_line_description = ""
+
+    # Single scan over setup.py, the first occurrence of each field wins
+    for match in setup_re.finditer(setup):
+        name = match.lastgroup
+
+        if name == "script":
+            cli, package = match.group("cli", "package")
+            setup_info.scripts[cli] = package
+        elif name == "new_line_description":
+            new_line_description = new_line_description or match.group(name)
+        elif name is not None and not getattr(setup_info, name):
+            setattr(setup_info, name, match.group(name))
+
+    # The single line description is preferred wherever it appears
+    if not setup_info.description:
+        setup_info.description = new_line_description
+
+    missing_fields = [
+        name for name in REQUIRED_SETUP_FIELDS if not getattr(setup_info, name)
+    ]
+
+    if missing_fields:
+        raise ValueError(
+            "In setup.py missing these fields: {}".format(", ".join(missing_fields))
+        )
+
+    return setup_info
+
+
+@dataclass(frozen=True)
+class Requirement:
+    name: Optional[str]
+    specs: Tuple[Tuple[str, str], ...] = ()
+    extras: Tuple[str, ...] = ()
+    editable: bool = False
+    path: str = ""
+
+
+_requirements_cache: Dict[
+    Tuple[str, str], Tuple[Dict[Path, int], Tuple[Requirement, ...]]
+] = {}
+
+
+def parse_editable_requirement(location: str) -> Requirement:
+    egg = egg_re.search(location)
+
+    if egg is None:
+        return Requirement(name=None, editable=True, path=location)
+
+    extras = egg.group("extras")
+
+    return Requirement(
+        name=egg.group("name"),
+        extras=tuple(extra.strip() for extra in extras.split(",")) if extras else (),
+        editable=True,
+        path=location.split("#", 1)[0],
+    )
+
+
+def parse_requirements(
+    text: str, base_path: Path, included_paths: List[Path]
+) -> List[Requirement]:
+    from packaging.requirements import Requirement as PackagingRequirement
+
+    parsed = []
+
+    for line in text.splitlines():
+        line = requirement_comment_re.sub("", line).strip()
+
+        if not line:
+            continue
+
+        option = requirement_option_re.match(line)
+
+        if option is not None:
+            name, value = option.group("option", "value")
+
+            # Editable packages are not PEP 508 requirements
+            if name in ("-e", "--editable"):
+                parsed.append(parse_editable_requirement(value))
+
+            # Nested requirement files are relative to the including file
+            elif name in ("-r", "--requirement"):
+                included_path = base_path / value
+                included_paths.append(included_path)
+                parsed.extend(
+                    parse_requirements(
+                        included_path.read_text(encoding="utf-8"),
+                        included_path.parent,
+                        included_paths,
+                    )
+                )
+
+            elif name not in IGNORED_REQUIREMENT_OPTIONS:
+                raise ValueError(f"Unsupported requirement option: {line}")
+
+            continue
+
+        requirement = PackagingRequirement(line)
+        parsed.append(
+            Requirement(
+                name=requirement.name,
+                specs=tuple(
+                    (spec.operator, spec.version) for spec in requirement.specifier
+                ),
+                extras=tuple(sorted(requirement.extras)),
+            )
+        )
 
-def get_description(setup: str) -> Optional[str]:
-    for description in description_re.finditer(setup):
-        return description.groupdict()["description"]
+    return parsed
 
-    new_line_description = new_line_description_re.findall(setup)
 
-    return new_line_description[0] if new_line_description else ""
+def get_poetry_section(pyproject: MutableMapping) -> MutableMapping:
+    poetry: MutableMapping = pyproject.setdefault("tool", {}).setdefault("poetry", {})
+
+    return poetry
 
 
 def add_poetry_section(
     package_path: Path,
-    pyproject: MutableMapping,
-    setup: str,
+    poetry: MutableMapping,
+    setup_info: SetupInfo,
     namespace: Optional[str],
-) -> MutableMapping:
-    poetry = pyproject.setdefault("tool", {}).setdefault("poetry", {})
+) -> None:
     poetry["name"] = package_path.stem.replace("_", "-")
-    poetry["description"] = get_description(setup)
-    poetry["authors"] = [
-        author_re.findall(setup)[0] + " <" + author_email_re.findall(setup)[0] + ">"
-    ]
+    poetry["description"] = setup_info.description
+    poetry["authors"] = [setup_info.author + " <" + setup_info.author_email + ">"]
     poetry["readme"] = "README.md"
-    poetry["repository"] = url_re.findall(setup)[0]
-    poetry["version"] = version_re.findall(setup)[0]
+    poetry["repository"] = setup_info.url
+    poetry["version"] = setup_info.version
 
     if namespace:
         poetry["packages"] = [{"include": namespace}]
 
-    return pyproject
 
+def get_requirement_specs(
+    requirement: Requirement, dev: bool
+) -> Union[str, Dict[str, Any]]:
+    specs: Union[str, Dict[str, Any]]
 
-def add_requirement_section(
-    pyproject: MutableMapping, requirements: Iterable, dev: bool
-) -> MutableMapping:
-    section = ("dev-" if dev else "") + "dependencies"
-    dependencies = (
-        pyproject.setdefault("tool", {})
-        .setdefault("poetry", {})
-        .setdefault(section, {})
-    )
+    # Editable package
+    if requirement.editable:
+        specs = {"path": requirement.path[5:].strip(), "develop": True}
 
-    for requirement in requirements:
-        # Editable package
-        if requirement.editable:
-            specs = {"path": requirement.path[5:].strip(), "develop": True}
+        if dev:
+            specs["extras"] = ["dev"]
 
-            if dev:
-                specs["extras"] = ["dev"]
+    else:
+        requirement_specs = requirement.specs
+        specs_len = len(requirement_specs)
 
         # Single version spec
-        elif len(requirement.specs) == 1:
-            specs = "^" + requirement.specs[0][1]
+        if specs_len == 1:
+            specs = "^" + requirement_specs[0][1]
 
         # No specs
-        elif len(requirement.specs) == 0:
+        elif specs_len == 0:
             raise NotImplementedError
 
         # Anything else
         else:
             raise NotImplementedError
 
-        # Has extra requirements
-        if requirement.extras:
-            if not isinstance(specs, dict):
-                specs = {"version": specs}
+    # Has extra requirements
+    extras = requirement.extras
 
-            specs["extras"] = requirement.extras
+    if extras:
+        if not isinstance(specs, dict):
+            specs = {"version": specs}
 
-        # Write spec
-        dependencies[requirement.name] = specs
+        specs["extras"] = list(extras)
 
-    return pyproject
+    return specs
 
 
-def get_python_version(setup: str) -> str:
-    python_requires: Optional[List[str]] = python_requires_re.findall(setup)
+def add_requirement_section(
+    poetry: MutableMapping, requirements: Iterable, dev: bool
+) -> None:
+    section = ("dev-" if dev else "") + "dependencies"
+    dependencies = poetry.setdefault(section, {})
 
-    if not python_requires:
-        return "^3.9"
+    for requirement in requirements:
+        dependencies[requirement.name] = get_requirement_specs(requirement, dev)
 
-    return python_requires[0].replace(">=", "^")
 
+def get_python_version(setup_info: SetupInfo) -> str:
+    if not setup_info.python_requires:
+        return "^3.9"
 
-def add_python_version(pyproject: MutableMapping, setup: str) -> MutableMapping:
-    dependencies = (
-        pyproject.setdefault("tool", {})
-        .setdefault("poetry", {})
-        .setdefault("dependencies", {})
-    )
-    dependencies["python"] = get_python_version(setup)
+    return setup_info.python_requires.replace(">=", "^")
 
-    return pyproject
+
+def add_python_version(poetry: MutableMapping, setup_info: SetupInfo) -> None:
+    dependencies = poetry.setdefault("dependencies", {})
+    dependencies["python"] = get_python_version(setup_info)
 
 
 def get_requirement_name(requirement: Requirement) -> str:
@@ -140,20 +298,72 @@ def get_requirement_name(requirement: Requirement) -> str:
     return name
 
 
-def load_requirements(package_path: Path, requirement_filename: str) -> Iterable:
-    requirements_in = list(
-        requirements.parse((package_path / f"{requirement_filename}.in").open())
+def load_requirements(
+    package_path: Path,
+    requirement_filename: str,
+    source_paths: Optional[List[Path]] = None,
+) -> List[Requirement]:
+    requirements_in_path = package_path / f"{requirement_filename}.in"
+    requirements_txt_path = package_path / f"{requirement_filename}.txt"
+
+    # Reuse the parsed requirements while the source files, including the
+    # ones pulled in with -r, are unchanged
+    cache_key = (str(package_path.resolve()), requirement_filename)
+    cached = _requirements_cache.get(cache_key)
+
+    if cached is not None:
+        source_mtimes, cached_requirements = cached
+
+        if all(
+            path.exists() and path.stat().st_mtime_ns == mtime
+            for path, mtime in source_mtimes.items()
+        ):
+            if source_paths is not None:
+                source_paths.extend(source_mtimes)
+
+            # Hand out a new list each time so callers can't alter the cache
+            return list(cached_requirements)
+
+    parsed_paths = [requirements_in_path, requirements_txt_path]
+    source_mtimes = {path: path.stat().st_mtime_ns for path in parsed_paths}
+
+    requirements_in = parse_requirements(
+        requirements_in_path.read_text(encoding="utf-8"),
+        package_path,
+        parsed_paths,
     )
 
-    # Strips the --hash:... blocks because not supported by requirements-parse
-    requirements_txt_raw = (package_path / f"{requirement_filename}.txt").read_text()
-    requirements_txt_raw = package_hash_re.sub("", requirements_txt_raw)
-    requirements_txt_raw = requirements_txt_raw.replace("\\", "")
-    requirements_txt = list(requirements.parse(requirements_txt_raw))
+    # Strips the --hash:... blocks because not supported by packaging
+    requirements_txt_raw = bytearray()
 
-    missing_names = [
-        requirement for requirement in requirements_in if requirement.name is None
-    ]
+    for line in requirements_txt_path.read_bytes().split(b"\n"):
+        hash_index = line.find(b" --hash=")
+        line = (line if hash_index < 0 else line[:hash_index]).replace(b"\\", b"")
+        line = line.strip()
+
+        if not line or line.startswith(b"--hash="):
+            continue
+
+        # Hashes not separated by a plain space, rare enough to afford a regex
+        if b"--hash=" in line:
+            line = package_hash_re.sub(b"", line).strip()
+
+        requirements_txt_raw += line
+        requirements_txt_raw += b"\n"
+
+    requirements_txt = parse_requirements(
+        requirements_txt_raw.decode("utf-8"), package_path, parsed_paths
+    )
+
+    requirements_in_map: Dict[str, Requirement] = {}
+    missing_names: List[Requirement] = []
+
+    for requirement in requirements_in:
+        if requirement.name is None:
+            missing_names.append(requirement)
+            continue
+
+        requirements_in_map[requirement.name.replace("_", "-")] = requirement
 
     if missing_names:
         raise ValueError(
@@ -162,120 +372,218 @@ def load_requirements(package_path: Path, requirement_filename: str) -> Iterable
             )
         )
 
-    requirements_in_map = {
-        requirement.name.replace("_", "-"): requirement
-        for requirement in requirements_in
-    }
-    requirements_txt_map = {
-        requirement.name.replace("_", "-"): requirement
-        for requirement in requirements_txt
-    }
+    requirements_txt_map: Dict[str, Requirement] = {}
+
+    for requirement in requirements_txt:
+        if requirement.name is None:
+            raise ValueError("At least one editable requirement without egg=<name>")
 
-    if None in requirements_in_map or None in requirements_txt_map:
-        raise ValueError("At least one editable requirement without egg=<name>")
+        requirements_txt_map[requirement.name.replace("_", "-")] = requirement
 
-    return (
+    result = [
         requirements_txt_map[requirement_in]
         for requirement_in in requirements_in_map
         if requirement_in != "pip-tools"
-    )
+    ]
+    for path in parsed_paths:
+        source_mtimes.setdefault(path, path.stat().st_mtime_ns)
 
+    _requirements_cache[cache_key] = (source_mtimes, tuple(result))
 
-def add_build_system(pyproject: MutableMapping) -> MutableMapping:
-    build_system = pyproject.setdefault("build-system", {})
-    build_system["requires"] = ["setuptools", "poetry-core>=1.0.0"]
-    build_system["build-backend"] = "poetry.core.masonry.api"
+    if source_paths is not None:
+        source_paths.extend(source_mtimes)
 
-    return pyproject
+    return result
 
 
-def add_scripts(pyproject: MutableMapping, setup: str) -> MutableMapping:
-    matches = (match.groupdict() for match in console_scripts_re.finditer(setup))
-    console_scripts = {match["cli"]: match["package"] for match in matches}
+def add_build_system(pyproject: MutableMapping) -> None:
+    build_system = pyproject.setdefault("build-system", {})
+    build_system["requires"] = ["setuptools", "poetry-core>=1.0.0"]
+    build_system["build-backend"] = "poetry.core.masonry.api"
 
-    if console_scripts:
-        scripts = (
-            pyproject.setdefault("tool", {})
-            .setdefault("poetry", {})
-            .setdefault("scripts", {})
-        )
-        scripts.update(console_scripts)
 
-    return pyproject
+def add_scripts(poetry: MutableMapping, setup_info: SetupInfo) -> None:
+    if setup_info.scripts:
+        scripts = poetry.setdefault("scripts", {})
+        scripts.update(setup_info.scripts)
 
 
-def add_private_repo(pyproject: MutableMapping, private_repo: str) -> MutableMapping:
+def add_private_repo(poetry: MutableMapping, private_repo: str) -> None:
     name, url = private_repo.split(":", maxsplit=1)
 
-    sources = (
-        pyproject.setdefault("tool", {}).setdefault("poetry").setdefault("source", [])
-    )
+    sources = poetry.setdefault("source", [])
 
     for source in sources:
         if source["name"] == name:
             source["url"] = url
 
-            return pyproject
+            return
 
     sources.append({"name": name, "url": url})
 
-    return pyproject
+
+def get_migrate_stamp(
+    package_path: Path,
+    source_paths: Iterable[Path],
+    namespace: Optional[str],
+    private_repo: Optional[str],
+) -> str:
+    stamp = [namespace or "", private_repo or ""]
+
+    # Paths relative to the package, so the stamp holds from any working directory
+    for path in dict.fromkeys(source_paths):
+        mtime = str(path.stat().st_mtime_ns) if path.exists() else "-"
+        stamp.append(f"{mtime} {os.path.relpath(path, package_path)}")
+
+    return "\n".join(stamp)
+
+
+def is_migrate_stamp_current(
+    package_path: Path, namespace: Optional[str], private_repo: Optional[str]
+) -> bool:
+    stamp_path = package_path / MIGRATE_STAMP_FILENAME
+
+    if not stamp_path.exists():
+        return False
+
+    stamp = stamp_path.read_text(encoding="utf-8")
+    source_lines = stamp.split("\n")[2:]
+
+    # Stamps written before the source paths were recorded
+    if not source_lines or not all(" " in line for line in source_lines):
+        return False
+
+    source_paths = [package_path / line.split(" ", 1)[1] for line in source_lines]
+
+    return stamp == get_migrate_stamp(
+        package_path, source_paths, namespace, private_repo
+    )
 
 
 def update_pyproject(
     package_path: Path, namespace: Optional[str], private_repo: Optional[str]
 ) -> None:
+    import tomli_w
+
+    if sys.version_info >= (3, 11):
+        import tomllib
+    else:
+        import tomli as tomllib
+
     setup_path = package_path / "setup.py"
 
     if not setup_path.exists():
         return
 
-    setup = setup_path.read_text()
+    # Skip the migration if neither the inputs, -r includes as well, nor the
+    # options changed since the last successful run
+    if is_migrate_stamp_current(package_path, namespace, private_repo):
+        return
+
+    setup_info = scan_setup(setup_path.read_text(encoding="utf-8"))
     pyproject_path = package_path / "pyproject.toml"
-    requirements = load_requirements(package_path, "requirements")
-    requirements_dev = load_requirements(package_path, "requirements-dev")
+    source_paths = [package_path / filename for filename in MIGRATE_STAMP_INPUTS]
+    requirements = load_requirements(package_path, "requirements", source_paths)
+    requirements_dev = load_requirements(package_path, "requirements-dev", source_paths)
+
+    with pyproject_path.open("rb") as f:
+        pyproject = tomllib.load(f)
+
+    add_build_system(pyproject)
 
-    pyproject = toml.load(pyproject_path.open())
-    pyproject = add_poetry_section(package_path, pyproject, setup, namespace)
-    pyproject = add_python_version(pyproject, setup)
-    pyproject = add_build_system(pyproject)
-    pyproject = add_requirement_section(pyproject, requirements, False)
-    pyproject = add_requirement_section(pyproject, requirements_dev, True)
-    pyproject = add_scripts(pyproject, setup)
+    poetry = get_poetry_section(pyproject)
+    add_poetry_section(package_path, poetry, setup_info, namespace)
+    add_python_version(poetry, setup_info)
+    add_requirement_section(poetry, requirements, False)
+    add_requirement_section(poetry, requirements_dev, True)
+    add_scripts(poetry, setup_info)
 
     if private_repo:
-        pyproject = add_private_repo(pyproject, private_repo)
+        add_private_repo(poetry, private_repo)
 
-    toml.dump(pyproject, pyproject_path.open("w"))
+    # Write aside and swap in, so a failure never leaves a truncated pyproject.toml
+    pyproject_tmp_path = pyproject_path.with_suffix(".toml.tmp")
+
+    try:
+        pyproject_tmp_path.write_text(tomli_w.dumps(pyproject), encoding="utf-8")
+        shutil.copymode(pyproject_path, pyproject_tmp_path)
+        os.replace(pyproject_tmp_path, pyproject_path)
+    except BaseException:
+        pyproject_tmp_path.unlink(missing_ok=True)
+        raise
+
+    stamp = get_migrate_stamp(package_path, source_paths, namespace, private_repo)
+    (package_path / MIGRATE_STAMP_FILENAME).write_text(stamp, encoding="utf-8")
 
 
 def remove_requirements(package_path: Path) -> None:
-    for requirement in package_path.glob("requirements*"):
-        requirement.unlink()
+    with os.scandir(package_path) as entries:
+        for entry in entries:
+            if entry.name.startswith("requirements") and entry.is_file():
+                os.unlink(entry.path)
 
 
 def remove_setup(package_path: Path) -> None:
     (package_path / "setup.py").unlink(missing_ok=True)
 
 
-def check_dependencies(package_path: Path) -> None:
+def remove_migrate_stamp(package_path: Path) -> None:
+    (package_path / MIGRATE_STAMP_FILENAME).unlink(missing_ok=True)
+
+
+def run_poetry(
+    package_path: Path, args: List[str], env: Dict[str, str], label_output: bool
+) -> None:
+    command = ["poetry", *args]
+
+    if not label_output:
+        subprocess.check_call(command, cwd=package_path, env=env)
+        return
+
+    # Label every line, parallel migrations share the same terminal
+    with subprocess.Popen(
+        command,
+        cwd=package_path,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        encoding="utf-8",
+        errors="replace",
+    ) as process:
+        assert process.stdout is not None
+
+        for line in process.stdout:
+            click.echo(f"[{package_path}] {line.rstrip()}")
+
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command)
+
+
+def check_dependencies(package_path: Path, label_output: bool = False) -> None:
     env = dict(os.environ)
     env.pop("POETRY", None)
     env.pop("VIRTUAL_ENV", None)
 
-    subprocess.check_call(["poetry", "lock"], cwd=package_path, env=env)
-    subprocess.check_call(
-        ["poetry", "install", "--remove-untracked"], cwd=package_path, env=env
-    )
+    run_poetry(package_path, ["lock"], env, label_output)
+    run_poetry(package_path, ["install", "--remove-untracked"], env, label_output)
 
 
 def update_safety_check(package_path: Path) -> None:
     check_path = package_path / "bin" / "check"
 
-    check = check_path.read_text()
-    check = check.replace(PREVIOUS_SAFETY_COMMAND, NEW_SAFETY_COMMAND)
-    check = check.replace(PREVIOUS_TIME_COMMAND, NEW_TIME_COMMAND)
-    check_path.write_text(check)
+    # Nothing to rewrite while the commands are unchanged
+    if (
+        PREVIOUS_SAFETY_COMMAND == NEW_SAFETY_COMMAND
+        and PREVIOUS_TIME_COMMAND == NEW_TIME_COMMAND
+    ):
+        return
+
+    check = check_path.read_text(encoding="utf-8")
+    updated = check.replace(PREVIOUS_SAFETY_COMMAND, NEW_SAFETY_COMMAND)
+    updated = updated.replace(PREVIOUS_TIME_COMMAND, NEW_TIME_COMMAND)
+
+    if updated != check:
+        check_path.write_text(updated, encoding="utf-8")
 
 
 def migrate(
@@ -292,11 +600,95 @@ def migrate(
     if delete:
         remove_requirements(package_path)
         remove_setup(package_path)
+        remove_migrate_stamp(package_path)
+
+
+def run_in_parallel(
+    task: Callable[[Path], None],
+    package_paths: List[Path],
+    max_workers: int,
+    failures: List[str],
+) -> List[Path]:
+    # Migrations mostly wait on Poetry subprocesses, so threads overlap them fine
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            (package_path, executor.submit(task, package_path))
+            for package_path in package_paths
+        ]
+
+    succeeded = []
+
+    for package_path, future in futures:
+        try:
+            future.result()
+        except Exception as error:
+            failures.append(f"{package_path}: {error}")
+        else:
+            succeeded.append(package_path)
+
+    return succeeded
+
+
+def migrate_many(
+    package_paths: Iterable[Path],
+    namespace: Optional[str],
+    delete: bool,
+    private_repo: Optional[str],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> None:
+    # The same package given twice, e.g. relative and absolute, is migrated once
+    unique_paths: List[Path] = []
+    resolved_paths = set()
+
+    for package_path in package_paths:
+        resolved_path = package_path.resolve()
+
+        if resolved_path not in resolved_paths:
+            resolved_paths.add(resolved_path)
+            unique_paths.append(package_path)
+
+    if len(unique_paths) == 1:
+        migrate(unique_paths[0], namespace, delete, private_repo)
+        return
+
+    def lock_and_install(package_path: Path) -> None:
+        check_dependencies(package_path, label_output=True)
+        update_safety_check(package_path)
+
+    def remove_migrated_files(package_path: Path) -> None:
+        remove_requirements(package_path)
+        remove_setup(package_path)
+        remove_migrate_stamp(package_path)
+
+    failures: List[str] = []
+
+    # Every package finishes a phase before the next one starts, so locking never
+    # reads a sibling package (-e ../sibling) halfway through its own migration.
+    # Packages failing a phase skip the later ones.
+    migrated = run_in_parallel(
+        lambda package_path: update_pyproject(package_path, namespace, private_repo),
+        unique_paths,
+        max_workers,
+        failures,
+    )
+    migrated = run_in_parallel(lock_and_install, migrated, max_workers, failures)
+
+    if delete:
+        run_in_parallel(remove_migrated_files, migrated, max_workers, failures)
+
+    if failures:
+        raise click.ClickException(
+            "Migration failed for {} package(s):\n{}".format(
+                len(failures), "\n".join(failures)
+            )
+        )
 
 
 @click.command()
 @click.argument(
-    "package_path",
+    "package_paths",
+    nargs=-1,
+    required=True,
     type=click.Path(exists=True, file_okay=False, writable=True, path_type=Path),
 )
 @click.option("--namespace")
@@ -304,13 +696,22 @@ def migrate(
     "--private-repo", help="An optional private repository in the form of <name>:<url>"
 )
 @click.option("-D", "--delete", is_flag=True)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=DEFAULT_MAX_WORKERS,
+    show_default=True,
+    help="Number of packages to migrate in parallel",
+)
 def main(
-    package_path: Path,
+    package_paths: Tuple[Path, ...],
     namespace: Optional[str],
     delete: bool,
     private_repo: Optional[str],
+    jobs: int,
 ) -> None:
-    migrate(package_path, namespace, delete, private_repo)
+    migrate_many(package_paths, namespace, delete, private_repo, jobs)
 
 
 if __name__ == "__main__":
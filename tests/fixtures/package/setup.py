@@ -0,0 +1,16 @@
+from setuptools import setup
+
+setup(
+    name="package",
+    version="1.2.3",
+    description="A sample package",
+    author="Jane Doe",
+    author_email="jane@example.com",
+    url="https://example.com/package",
+    python_requires=">=3.9",
+    entry_points={
+        "console_scripts": [
+            "package_cli = package.cli:main",
+        ]
+    },
+)
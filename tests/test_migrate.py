@@ -0,0 +1,188 @@
+import dataclasses
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+import migrate
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    import tomli as tomllib
+
+FIXTURES_PATH = Path(__file__).parent / "fixtures"
+
+
+def test_update_pyproject(tmp_path):
+    package_path = tmp_path / "package"
+    shutil.copytree(FIXTURES_PATH / "package", package_path)
+
+    migrate.update_pyproject(package_path, None, None)
+
+    # Generated by the requirements-parser based implementation
+    expected = tomllib.loads(
+        (FIXTURES_PATH / "package.pyproject.toml").read_text(encoding="utf-8")
+    )
+    pyproject = tomllib.loads(
+        (package_path / "pyproject.toml").read_text(encoding="utf-8")
+    )
+
+    assert pyproject == expected
+
+
+def test_scan_setup_single_line():
+    setup = (
+        'setup(name="package", version="1.0", author="A", author_email="a@b.c", '
+        'url="https://x", entry_points={"console_scripts": ["foo = x.cli:main"]}, '
+        'python_requires=">=3.10", description="d")'
+    )
+
+    setup_info = migrate.scan_setup(setup)
+
+    assert setup_info.scripts == {"foo": "x.cli:main"}
+    assert setup_info.python_requires == ">=3.10"
+    assert setup_info.description == "d"
+
+
+def test_scan_setup_missing_fields():
+    setup = 'setup(name="package", version="1.0", author="A")'
+
+    with pytest.raises(ValueError, match="author_email, url"):
+        migrate.scan_setup(setup)
+
+
+@pytest.fixture
+def migrate_calls(monkeypatch):
+    calls = []
+
+    def record(step, fail_for=()):
+        def stub(package_path, *args, **kwargs):
+            calls.append((step, package_path.name))
+
+            if package_path.name in fail_for:
+                raise RuntimeError(f"{step} failed")
+
+        return stub
+
+    def patch(fail_update=(), fail_lock=()):
+        monkeypatch.setattr(migrate, "update_pyproject", record("update", fail_update))
+        monkeypatch.setattr(migrate, "check_dependencies", record("lock", fail_lock))
+        monkeypatch.setattr(migrate, "update_safety_check", record("safety"))
+        monkeypatch.setattr(migrate, "remove_requirements", record("remove"))
+        monkeypatch.setattr(migrate, "remove_setup", record("remove"))
+        return calls
+
+    return patch
+
+
+def test_migrate_many_phases(tmp_path, monkeypatch, migrate_calls):
+    calls = migrate_calls()
+    monkeypatch.chdir(tmp_path)
+    package_paths = [Path("a"), tmp_path / "b", tmp_path / "a", Path("b/../b")]
+    for name in ("a", "b"):
+        (tmp_path / name).mkdir()
+
+    migrate.migrate_many(package_paths, None, True, None, max_workers=2)
+
+    steps = [step for step, _ in calls]
+    assert sorted(calls) == sorted(
+        (step, name)
+        for step in ("update", "lock", "safety", "remove", "remove")
+        for name in ("a", "b")
+    )
+    assert steps[:2] == ["update", "update"]
+    assert steps[-4:] == ["remove"] * 4
+
+
+def test_migrate_many_reports_all_failures(tmp_path, migrate_calls):
+    calls = migrate_calls(fail_update=("a",), fail_lock=("b",))
+    package_paths = [tmp_path / name for name in ("a", "b", "c")]
+
+    with pytest.raises(migrate.click.ClickException) as error:
+        migrate.migrate_many(package_paths, None, True, None)
+
+    assert "Migration failed for 2 package(s)" in error.value.message
+    assert f"{tmp_path / 'a'}: update failed" in error.value.message
+    assert f"{tmp_path / 'b'}: lock failed" in error.value.message
+    assert ("lock", "a") not in calls
+    assert [name for step, name in calls if step == "remove"] == ["c", "c"]
+
+
+def test_migrate_many_single_package(tmp_path, monkeypatch):
+    migrated = []
+    monkeypatch.setattr(
+        migrate, "migrate", lambda package_path, *args: migrated.append(package_path)
+    )
+
+    migrate.migrate_many([tmp_path, tmp_path / "."], None, False, None)
+
+    assert migrated == [tmp_path]
+
+
+def test_update_pyproject_stamp(tmp_path, monkeypatch):
+    package_path = tmp_path / "package"
+    shutil.copytree(FIXTURES_PATH / "package", package_path)
+    requirements_dev_in_path = package_path / "requirements-dev.in"
+    requirements_dev_in_path.write_text(
+        "-r common.in\n" + requirements_dev_in_path.read_text(encoding="utf-8"),
+        encoding="utf-8",
+    )
+    (package_path / "common.in").write_text("click\n", encoding="utf-8")
+
+    scans = []
+    scan_setup = migrate.scan_setup
+    monkeypatch.setattr(
+        migrate, "scan_setup", lambda setup: scans.append(setup) or scan_setup(setup)
+    )
+
+    def touch(path):
+        mtime_ns = path.stat().st_mtime_ns + 1_000_000_000
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    migrate.update_pyproject(package_path, None, None)
+    migrate.update_pyproject(package_path, None, None)
+    assert len(scans) == 1
+
+    for path in (package_path / "requirements.txt", package_path / "common.in"):
+        touch(path)
+        migrate.update_pyproject(package_path, None, None)
+        migrate.update_pyproject(package_path, None, None)
+
+    assert len(scans) == 3
+
+    migrate.update_pyproject(package_path, "namespace", None)
+    migrate.update_pyproject(package_path, "namespace", "repo:https://repo")
+    migrate.update_pyproject(package_path, "namespace", "repo:https://repo")
+    assert len(scans) == 5
+
+    migrate.remove_setup(package_path)
+    assert (package_path / migrate.MIGRATE_STAMP_FILENAME).exists()
+
+
+def test_load_requirements_cache(tmp_path):
+    package_path = tmp_path / "package"
+    shutil.copytree(FIXTURES_PATH / "package", package_path)
+
+    requirements = migrate.load_requirements(package_path, "requirements")
+    requests = next(r for r in requirements if r.name == "requests")
+    requirements.clear()
+    specs = migrate.get_requirement_specs(requests, False)
+    specs["extras"].append("security")
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        requests.extras = ()
+
+    cached = migrate.load_requirements(package_path, "requirements")
+    assert [r.name for r in cached] == ["click", "requests"]
+    assert cached[1].extras == ("socks",)
+
+    requirements_in_path = package_path / "requirements.in"
+    requirements_in_path.write_text("click\n", encoding="utf-8")
+    mtime_ns = requirements_in_path.stat().st_mtime_ns + 1_000_000_000
+    os.utime(requirements_in_path, ns=(mtime_ns, mtime_ns))
+
+    reloaded = migrate.load_requirements(package_path, "requirements")
+    assert [r.name for r in reloaded] == ["click"]